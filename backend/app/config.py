@@ -1,37 +1,49 @@
 """Configuration management with environment variables."""
 import os
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 from pathlib import Path
 
-# Load .env file from project root
+# Load .env file from project root. Runs once per process when the module is
+# first imported (again only if a reloader re-executes it); variables already
+# in the environment are never overridden.
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(env_path)
 
 
+@dataclass(frozen=True, slots=True)
 class Settings:
     """Application settings loaded from environment variables."""
-    
+
     # Google Maps API
-    GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
-    
+    GOOGLE_MAPS_API_KEY: str = field(default=os.getenv("GOOGLE_MAPS_API_KEY", ""), repr=False)
+
     # API usage limits (to stay within free tier)
     MONTHLY_API_LIMIT: int = int(os.getenv("MONTHLY_API_LIMIT", "500"))
-    
+
     # Firecrawl API
-    FIRECRAWL_API_KEY: str = os.getenv("FIRECRAWL_API_KEY", "")
+    FIRECRAWL_API_KEY: str = field(default=os.getenv("FIRECRAWL_API_KEY", ""), repr=False)
     FIRECRAWL_MONTHLY_LIMIT: int = int(os.getenv("FIRECRAWL_MONTHLY_LIMIT", "400"))
-    
+    # How long a scraped page is reused before re-scraping (0 disables the cache)
+    FIRECRAWL_CACHE_TTL_HOURS: int = int(os.getenv("FIRECRAWL_CACHE_TTL_HOURS", "168"))
+
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./leads.db")
-    
-    def validate(self) -> list[str]:
-        """Validate required settings. Returns list of errors."""
+
+    # Validation errors, computed once since settings are immutable
+    _errors: tuple[str, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
         errors = []
         if not self.GOOGLE_MAPS_API_KEY:
             errors.append("GOOGLE_MAPS_API_KEY is not set")
         if not self.FIRECRAWL_API_KEY:
             errors.append("FIRECRAWL_API_KEY is not set (company research/SEO disabled)")
-        return errors
+        object.__setattr__(self, "_errors", tuple(errors))
+
+    def validate(self) -> tuple[str, ...]:
+        """Validate required settings. Returns tuple of errors."""
+        return self._errors
 
 
 settings = Settings()
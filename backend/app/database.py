@@ -1,32 +1,55 @@
 """SQLite database setup with SQLAlchemy."""
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean
+import logging
+from sqlalchemy import create_engine, event, func, inspect, text, type_coerce, Column, Index, Integer, String, Float, DateTime, Text, Boolean, JSON, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-import json
+from sqlalchemy.orm import deferred, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from .config import settings
 
-# Create engine - for SQLite, check_same_thread=False is needed for FastAPI
+logger = logging.getLogger(__name__)
+
+# Create engine - for SQLite, check_same_thread=False is needed for FastAPI.
+# A QueuePool keeps connections open across requests served by the threadpool.
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    poolclass=QueuePool,
+    pool_size=5,
+    max_overflow=10
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Enable WAL (concurrent readers alongside one writer) and tune caching."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")  # 64 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+# Objects stay loaded after commit so serializing a just-saved row does not
+# re-SELECT it
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 
 class Search(Base):
     """Track search history and API usage."""
     __tablename__ = "searches"
+    __table_args__ = (
+        Index("ix_searches_query_location", "query", "location"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     query = Column(String, nullable=False)  # e.g., "dentists"
     location = Column(String, nullable=False)  # e.g., "Cape Town, South Africa"
     radius_km = Column(Integer, default=10)
     results_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.current_timestamp())
 
 
 class Business(Base):
@@ -38,14 +61,15 @@ class Business(Base):
     name = Column(String, nullable=False)
     address = Column(String)
     phone = Column(String)
-    website = Column(String)
+    website = Column(String, index=True)
     rating = Column(Float)
     review_count = Column(Integer)
-    business_types = Column(String)  # JSON array of types
+    business_types = Column(JSON)  # JSON array of types
     latitude = Column(Float)
     longitude = Column(Float)
     search_id = Column(Integer)  # Which search found this
-    created_at = Column(DateTime, default=datetime.utcnow)
+    lead_score = Column(Integer, index=True)  # Stored calculate_lead_score()
+    created_at = Column(DateTime, default=func.current_timestamp())
     
     def calculate_lead_score(self) -> int:
         """
@@ -91,81 +115,137 @@ class Business(Base):
             "website": self.website,
             "rating": self.rating,
             "review_count": self.review_count,
-            "business_types": json.loads(self.business_types) if self.business_types else [],
+            "business_types": self.business_types or [],
             "latitude": self.latitude,
             "longitude": self.longitude,
-            "lead_score": self.calculate_lead_score(),
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "lead_score": self.lead_score if self.lead_score is not None else self.calculate_lead_score(),
+            "created_at": self.created_at
         }
+    
+    @classmethod
+    def rows_to_json(cls, query) -> str:
+        """
+        Serialize a Business query to a JSON array inside SQLite.
+        
+        Produces the same shape as to_dict() using json_object(), so list
+        endpoints can skip building ORM objects and dicts per row. SQLite
+        writes floats with 15 significant digits, which holds ratings and
+        coordinates from Places exactly.
+        """
+        business_types = type_coerce(cls.business_types, Text)
+        row_json = func.json_object(
+            "id", cls.id,
+            "place_id", cls.place_id,
+            "name", cls.name,
+            "address", cls.address,
+            "phone", cls.phone,
+            "website", cls.website,
+            "rating", cls.rating,
+            "review_count", cls.review_count,
+            "business_types", func.json(func.coalesce(func.nullif(business_types, "null"), "[]")),
+            "latitude", cls.latitude,
+            "longitude", cls.longitude,
+            "lead_score", cls.lead_score,
+            "created_at", func.replace(cls.created_at, " ", "T"),
+        )
+        rows = query.with_entities(row_json).all()
+        return "[" + ",".join(row for (row,) in rows) + "]"
 
 
 class APIUsage(Base):
     """Track API usage to stay within free tier."""
     __tablename__ = "api_usage"
+    __table_args__ = (
+        # One row per month
+        Index("uq_api_usage_month", "month", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     month = Column(String, nullable=False)  # Format: "2024-01"
     call_count = Column(Integer, default=0)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    last_updated = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
 
 
 class FirecrawlUsage(Base):
     """Track Firecrawl API usage to stay within free tier."""
     __tablename__ = "firecrawl_usage"
+    __table_args__ = (
+        # One row per month
+        Index("uq_firecrawl_usage_month", "month", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     month = Column(String, nullable=False)  # Format: "2024-01"
     credit_count = Column(Integer, default=0)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    last_updated = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
+class ScrapeCache(Base):
+    """Recent Firecrawl scrape results, reused so re-scrapes don't spend credits."""
+    __tablename__ = "scrape_cache"
+    
+    key = Column(String, primary_key=True)  # Hash of the URL
+    url = Column(String, nullable=False)
+    formats = Column(String)  # Comma-separated Firecrawl formats in the payload
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON
+    created_at = Column(DateTime, default=func.current_timestamp(), index=True)
 
 
 class CompanyResearch(Base):
     """Store company research data from Firecrawl."""
     __tablename__ = "company_research"
+    __table_args__ = (
+        # At most one record per business
+        Index("uq_company_research_business_id", "business_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    business_id = Column(Integer, index=True)  # Links to Business.id
-    scraped_at = Column(DateTime, default=datetime.utcnow)
+    business_id = Column(Integer)  # Links to Business.id
+    scraped_at = Column(DateTime, default=func.current_timestamp())
     
     # Basic info
     page_title = Column(String)
     meta_description = Column(Text)
     
     # Contact info
-    emails = Column(Text)  # JSON array
-    phones = Column(Text)  # JSON array
+    emails = Column(JSON)  # JSON array
+    phones = Column(JSON)  # JSON array
     
     # Social media
-    social_links = Column(Text)  # JSON object
+    social_links = Column(JSON)  # JSON object
     
     # Technical
-    technologies = Column(Text)  # JSON array
+    technologies = Column(JSON)  # JSON array
     
-    # Raw content (for future analysis)
-    raw_markdown = Column(Text)
+    # Raw content (for future analysis) - deferred so normal reads skip it
+    raw_markdown = deferred(Column(Text))
     
     def to_dict(self):
         """Convert to dictionary for JSON response."""
         return {
             "id": self.id,
             "business_id": self.business_id,
-            "scraped_at": self.scraped_at.isoformat() if self.scraped_at else None,
+            "scraped_at": self.scraped_at,
             "page_title": self.page_title,
             "meta_description": self.meta_description,
-            "emails": json.loads(self.emails) if self.emails else [],
-            "phones": json.loads(self.phones) if self.phones else [],
-            "social_links": json.loads(self.social_links) if self.social_links else {},
-            "technologies": json.loads(self.technologies) if self.technologies else [],
+            "emails": self.emails or [],
+            "phones": self.phones or [],
+            "social_links": self.social_links or {},
+            "technologies": self.technologies or [],
         }
 
 
 class SEOAnalysis(Base):
     """Store SEO analysis results."""
     __tablename__ = "seo_analyses"
+    __table_args__ = (
+        # At most one record per business
+        Index("uq_seo_analyses_business_id", "business_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    business_id = Column(Integer, index=True)  # Links to Business.id
-    analyzed_at = Column(DateTime, default=datetime.utcnow)
+    business_id = Column(Integer)  # Links to Business.id
+    analyzed_at = Column(DateTime, default=func.current_timestamp())
     
     # Scores (0-100)
     overall_score = Column(Float)
@@ -180,19 +260,26 @@ class SEOAnalysis(Base):
     # Grade (A+, A, B, C, D, F)
     grade = Column(String(2))
     
+    # Issue counts by severity
+    critical_count = Column(Integer)
+    warning_count = Column(Integer)
+    info_count = Column(Integer)
+    
     # Detailed data
-    metrics = Column(Text)  # JSON object
-    issues = Column(Text)  # JSON array
-    recommendations = Column(Text)  # JSON array
+    metrics = Column(JSON)  # JSON object
+    issues = Column(JSON)  # JSON array
+    recommendations = Column(JSON)  # JSON array
     
     def to_dict(self):
         """Convert to dictionary for JSON response."""
         return {
             "id": self.id,
             "business_id": self.business_id,
-            "analyzed_at": self.analyzed_at.isoformat() if self.analyzed_at else None,
+            "analyzed_at": self.analyzed_at,
             "overall_score": self.overall_score,
             "grade": self.grade,
+            # Constant-key dict literal: CPython builds it in one opcode, faster
+            # than dict(zip(keys, values)) or any precomputed template
             "scores": {
                 "title": self.title_score,
                 "meta": self.meta_score,
@@ -202,15 +289,91 @@ class SEOAnalysis(Base):
                 "links": self.link_score,
                 "technical": self.technical_score,
             },
-            "metrics": json.loads(self.metrics) if self.metrics else {},
-            "issues": json.loads(self.issues) if self.issues else [],
-            "recommendations": json.loads(self.recommendations) if self.recommendations else [],
+            "metrics": self.metrics or {},
+            "issues": self.issues or [],
+            "recommendations": self.recommendations or [],
         }
 
 
 def init_db():
     """Create all tables."""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _create_missing_indexes()
+    _backfill_lead_scores()
+
+
+def _add_missing_columns():
+    """Add nullable columns declared after a table was created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+# Unique indexes added to tables that may already hold duplicate keys, mapped
+# to the counter column summed into the surviving row (None keeps the newest)
+_UNIQUE_INDEX_MERGES = {
+    "uq_api_usage_month": "call_count",
+    "uq_firecrawl_usage_month": "credit_count",
+    "uq_company_research_business_id": None,
+    "uq_seo_analyses_business_id": None,
+}
+
+
+def _create_missing_indexes():
+    """Add indexes declared after a table was created (create_all skips existing tables)."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            with engine.begin() as conn:
+                if index.name in _UNIQUE_INDEX_MERGES:
+                    _merge_duplicate_rows(conn, index, _UNIQUE_INDEX_MERGES[index.name])
+                index.create(bind=conn)
+
+
+def _merge_duplicate_rows(conn, index, total_column=None):
+    """
+    Collapse rows that would violate a unique index into one row per key.
+    
+    Args:
+        conn: Connection inside the transaction that creates the index
+        index: Single-column unique Index about to be created
+        total_column: Counter column summed into the surviving row, if any
+    """
+    table = index.table.name
+    key = index.columns[0].name
+    # The newest row (highest id) for each key survives
+    survivors = f"SELECT MAX(id) FROM {table} WHERE {key} IS NOT NULL GROUP BY {key}"
+    if total_column:
+        conn.execute(text(
+            f"UPDATE {table} SET {total_column} = ("
+            f"SELECT SUM({total_column}) FROM {table} AS dup WHERE dup.{key} = {table}.{key}"
+            f") WHERE id IN ({survivors} HAVING COUNT(*) > 1)"
+        ))
+    removed = conn.execute(text(
+        f"DELETE FROM {table} WHERE {key} IS NOT NULL AND id NOT IN ({survivors})"
+    )).rowcount
+    if removed:
+        logger.warning(f"Merged {removed} duplicate {table} rows before creating {index.name}")
+
+
+def _backfill_lead_scores():
+    """Store lead scores for businesses saved before the column existed."""
+    db = SessionLocal()
+    try:
+        for business in db.query(Business).filter(Business.lead_score.is_(None)):
+            business.lead_score = business.calculate_lead_score()
+        db.commit()
+    finally:
+        db.close()
 
 
 def get_db():
@@ -4,18 +4,23 @@ from pathlib import Path
 from contextlib import asynccontextmanager
 
 # Add backend directory to path for imports
-backend_dir = Path(__file__).parent.parent
+backend_dir = Path(__file__).resolve().parent.parent
+FRONTEND_DIR = backend_dir.parent / "frontend"
 if str(backend_dir) not in sys.path:
     sys.path.insert(0, str(backend_dir))
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.database import init_db
 from app.config import settings
 from app.routers import search, businesses, research, seo
 
+# Settings are immutable, so configuration errors are known at import time
+_VALIDATION_ERRORS = settings.validate()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -24,10 +29,9 @@ async def lifespan(app: FastAPI):
     init_db()
     
     # Validate configuration
-    errors = settings.validate()
-    if errors:
+    if _VALIDATION_ERRORS:
         print("⚠️  Configuration warnings:")
-        for error in errors:
+        for error in _VALIDATION_ERRORS:
             print(f"   - {error}")
     else:
         print("✅ Configuration validated")
@@ -44,16 +48,17 @@ app = FastAPI(
     title="Lead Generation Tool",
     description="Find local businesses using Google Places API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware - explicit origins for security
-# Add your production URL(s) to this list
-ALLOWED_ORIGINS = [
+# Add your production URL(s) to this set (frozenset: O(1) per-request origin check)
+ALLOWED_ORIGINS = frozenset({
     "http://localhost:8000",
     "http://127.0.0.1:8000",
     "http://localhost:3000",  # If running frontend separately
-]
+})
 
 app.add_middleware(
     CORSMiddleware,
@@ -69,19 +74,18 @@ app.include_router(businesses.router)
 app.include_router(research.router)
 app.include_router(seo.router)
 
-# Serve frontend static files
-frontend_path = Path(__file__).parent.parent.parent / "frontend"
-if frontend_path.exists():
-    app.mount("/", StaticFiles(directory=str(frontend_path), html=True), name="frontend")
-
 
 @app.get("/api/health")
 def health_check():
     """Health check endpoint."""
-    errors = settings.validate()
     return {
-        "status": "healthy" if not errors else "degraded",
-        "config_errors": errors,
+        "status": "healthy" if not _VALIDATION_ERRORS else "degraded",
+        "config_errors": _VALIDATION_ERRORS,
         "api_key_configured": bool(settings.GOOGLE_MAPS_API_KEY)
     }
 
+
+# Serve frontend static files. Mounted last so the catch-all "/" mount
+# does not shadow API routes declared in this module.
+if FRONTEND_DIR.is_dir():
+    app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True, check_dir=False), name="frontend")
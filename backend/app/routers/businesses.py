@@ -1,7 +1,9 @@
 """Business API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional
+import orjson
 
 from app.database import get_db, Business
 
@@ -13,6 +15,7 @@ def list_businesses(
     search_id: Optional[int] = None,
     has_website: Optional[bool] = None,
     min_rating: Optional[float] = None,
+    sort_by: str = Query(default="rating", pattern="^(rating|lead_score)$"),
     limit: int = Query(default=50, le=200),
     offset: int = 0,
     db: Session = Depends(get_db)
@@ -23,6 +26,7 @@ def list_businesses(
     - **search_id**: Filter by search ID
     - **has_website**: Filter by whether business has a website
     - **min_rating**: Minimum Google rating
+    - **sort_by**: Sort by "rating" or "lead_score" (highest first)
     - **limit**: Max results to return
     - **offset**: Pagination offset
     """
@@ -41,20 +45,22 @@ def list_businesses(
         query = query.filter(Business.rating >= min_rating)
     
     total = query.count()
-    businesses = query.order_by(Business.rating.desc().nullslast()).offset(offset).limit(limit).all()
+    sort_column = Business.lead_score if sort_by == "lead_score" else Business.rating
+    page = query.order_by(sort_column.desc().nullslast()).offset(offset).limit(limit)
     
-    return {
+    # Rows arrive already serialized by SQLite; embed them without re-encoding
+    return ORJSONResponse({
         "total": total,
         "limit": limit,
         "offset": offset,
-        "businesses": [b.to_dict() for b in businesses]
-    }
+        "businesses": orjson.Fragment(Business.rows_to_json(page))
+    })
 
 
 @router.get("/{business_id}")
 def get_business(business_id: int, db: Session = Depends(get_db)):
     """Get a specific business by ID."""
-    business = db.query(Business).filter(Business.id == business_id).first()
+    business = db.get(Business, business_id)
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     return business.to_dict()
@@ -1,7 +1,7 @@
 """API router for company research using Firecrawl."""
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-import json
 
 from app.database import get_db, Business, CompanyResearch
 from services.firecrawl_api import (
@@ -34,8 +34,10 @@ def run_company_research(business_id: int, db: Session = Depends(get_db)):
     - Technologies used
     - Page metadata
     """
-    # Get the business
-    business = db.query(Business).filter(Business.id == business_id).first()
+    # Get the business (only the columns needed here)
+    business = db.query(Business.id, Business.name, Business.website).filter(
+        Business.id == business_id
+    ).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     
@@ -54,37 +56,24 @@ def run_company_research(business_id: int, db: Session = Depends(get_db)):
         # Extract company info
         company_info = service.extract_company_info(scraped)
         
-        # Check if we already have research for this business
-        existing = db.query(CompanyResearch).filter(
-            CompanyResearch.business_id == business_id
-        ).first()
-        
-        if existing:
-            # Update existing record
-            existing.page_title = company_info.get("title")
-            existing.meta_description = company_info.get("description")
-            existing.emails = json.dumps(company_info.get("emails", []))
-            existing.phones = json.dumps(company_info.get("phones", []))
-            existing.social_links = json.dumps(company_info.get("social_links", {}))
-            existing.technologies = json.dumps(company_info.get("technologies", []))
-            existing.raw_markdown = scraped.get("markdown", "")[:50000]  # Limit size
-            research = existing
-        else:
-            # Create new record
-            research = CompanyResearch(
-                business_id=business_id,
-                page_title=company_info.get("title"),
-                meta_description=company_info.get("description"),
-                emails=json.dumps(company_info.get("emails", [])),
-                phones=json.dumps(company_info.get("phones", [])),
-                social_links=json.dumps(company_info.get("social_links", {})),
-                technologies=json.dumps(company_info.get("technologies", [])),
-                raw_markdown=scraped.get("markdown", "")[:50000]  # Limit size
-            )
-            db.add(research)
+        values = {
+            "page_title": company_info.get("title"),
+            "meta_description": company_info.get("description"),
+            "emails": company_info.get("emails", []),
+            "phones": company_info.get("phones", []),
+            "social_links": company_info.get("social_links", {}),
+            "technologies": company_info.get("technologies", []),
+            "raw_markdown": scraped.get("markdown", ""),  # Truncated by the service
+        }
         
+        # Insert, or update the existing research for this business, in one statement
+        stmt = sqlite_insert(CompanyResearch).values(business_id=business_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CompanyResearch.business_id],
+            set_=values
+        ).returning(CompanyResearch)
+        research = db.scalars(stmt, execution_options={"populate_existing": True}).one()
         db.commit()
-        db.refresh(research)
         
         return {
             "success": True,
@@ -104,16 +93,14 @@ def run_company_research(business_id: int, db: Session = Depends(get_db)):
 @router.get("/{business_id}")
 def get_company_research(business_id: int, db: Session = Depends(get_db)):
     """Get stored company research for a business."""
-    # Get the business
-    business = db.query(Business).filter(Business.id == business_id).first()
+    # Get the business and its research in one query
+    business = db.query(Business.name, Business.website, CompanyResearch).outerjoin(
+        CompanyResearch, CompanyResearch.business_id == Business.id
+    ).filter(Business.id == business_id).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     
-    # Get research
-    research = db.query(CompanyResearch).filter(
-        CompanyResearch.business_id == business_id
-    ).first()
-    
+    research = business.CompanyResearch
     if not research:
         raise HTTPException(
             status_code=404,
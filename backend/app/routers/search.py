@@ -83,7 +83,9 @@ def get_search_history(
     db: Session = Depends(get_db)
 ):
     """Get recent search history."""
-    searches = db.query(Search).order_by(Search.created_at.desc()).limit(limit).all()
+    # Ids follow insertion order; created_at only has one-second resolution
+    # (and legacy rows carry microseconds), so it cannot order recent searches
+    searches = db.query(Search).order_by(Search.id.desc()).limit(limit).all()
     return [
         {
             "id": s.id,
@@ -91,7 +93,7 @@ def get_search_history(
             "location": s.location,
             "radius_km": s.radius_km,
             "results_count": s.results_count,
-            "created_at": s.created_at.isoformat()
+            "created_at": s.created_at
         }
         for s in searches
     ]
@@ -1,7 +1,8 @@
 """API router for SEO analysis."""
+from collections import Counter, defaultdict
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-import json
 
 from app.database import get_db, Business, SEOAnalysis
 from services.firecrawl_api import (
@@ -29,8 +30,10 @@ def run_seo_analysis(business_id: int, db: Session = Depends(get_db)):
     
     Returns a score (0-100) and grade (A+ to F) with detailed issues.
     """
-    # Get the business
-    business = db.query(Business).filter(Business.id == business_id).first()
+    # Get the business (only the columns needed here)
+    business = db.query(Business.id, Business.name, Business.website).filter(
+        Business.id == business_id
+    ).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     
@@ -41,14 +44,16 @@ def run_seo_analysis(business_id: int, db: Session = Depends(get_db)):
         )
     
     try:
-        # Use Firecrawl to get the HTML
+        # Use Firecrawl to get the HTML (markdown isn't needed here, so a
+        # cached research scrape, which holds both, is reused)
         firecrawl = FirecrawlService(db)
-        scraped = firecrawl.scrape_website(business.website)
+        scraped = firecrawl.scrape_website(business.website, formats=("html",))
         
-        # Run SEO analysis
+        # Run SEO analysis on the tree parsed by the scrape
         analyzer = SEOAnalyzer(
             html=scraped.get("html", ""),
-            url=business.website
+            url=business.website,
+            tree=scraped.get("tree")
         )
         report = analyzer.analyze()
         
@@ -58,49 +63,35 @@ def run_seo_analysis(business_id: int, db: Session = Depends(get_db)):
                 detail=report.get("error", "Analysis failed")
             )
         
-        # Check if we already have analysis for this business
-        existing = db.query(SEOAnalysis).filter(
-            SEOAnalysis.business_id == business_id
-        ).first()
-        
         scores = report.get("scores", {})
+        issues = report.get("issues", [])
+        severity_counts = Counter(i.get("severity") for i in issues)
+        values = {
+            "overall_score": report.get("overall_score"),
+            "title_score": scores.get("title"),
+            "meta_score": scores.get("meta"),
+            "heading_score": scores.get("headings"),
+            "content_score": scores.get("content"),
+            "image_score": scores.get("images"),
+            "link_score": scores.get("links"),
+            "technical_score": scores.get("technical"),
+            "grade": report.get("grade"),
+            "critical_count": severity_counts["critical"],
+            "warning_count": severity_counts["warning"],
+            "info_count": severity_counts["info"],
+            "metrics": report.get("metrics", {}),
+            "issues": issues,
+            "recommendations": report.get("recommendations", []),
+        }
         
-        if existing:
-            # Update existing record
-            existing.overall_score = report.get("overall_score")
-            existing.title_score = scores.get("title")
-            existing.meta_score = scores.get("meta")
-            existing.heading_score = scores.get("headings")
-            existing.content_score = scores.get("content")
-            existing.image_score = scores.get("images")
-            existing.link_score = scores.get("links")
-            existing.technical_score = scores.get("technical")
-            existing.grade = report.get("grade")
-            existing.metrics = json.dumps(report.get("metrics", {}))
-            existing.issues = json.dumps(report.get("issues", []))
-            existing.recommendations = json.dumps(report.get("recommendations", []))
-            analysis = existing
-        else:
-            # Create new record
-            analysis = SEOAnalysis(
-                business_id=business_id,
-                overall_score=report.get("overall_score"),
-                title_score=scores.get("title"),
-                meta_score=scores.get("meta"),
-                heading_score=scores.get("headings"),
-                content_score=scores.get("content"),
-                image_score=scores.get("images"),
-                link_score=scores.get("links"),
-                technical_score=scores.get("technical"),
-                grade=report.get("grade"),
-                metrics=json.dumps(report.get("metrics", {})),
-                issues=json.dumps(report.get("issues", [])),
-                recommendations=json.dumps(report.get("recommendations", []))
-            )
-            db.add(analysis)
-        
+        # Insert, or update the existing analysis for this business, in one statement
+        stmt = sqlite_insert(SEOAnalysis).values(business_id=business_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SEOAnalysis.business_id],
+            set_=values
+        ).returning(SEOAnalysis)
+        analysis = db.scalars(stmt, execution_options={"populate_existing": True}).one()
         db.commit()
-        db.refresh(analysis)
         
         return {
             "success": True,
@@ -120,16 +111,14 @@ def run_seo_analysis(business_id: int, db: Session = Depends(get_db)):
 @router.get("/{business_id}")
 def get_seo_analysis(business_id: int, db: Session = Depends(get_db)):
     """Get stored SEO analysis for a business."""
-    # Get the business
-    business = db.query(Business).filter(Business.id == business_id).first()
+    # Get the business and its analysis in one query
+    business = db.query(Business.name, Business.website, SEOAnalysis).outerjoin(
+        SEOAnalysis, SEOAnalysis.business_id == Business.id
+    ).filter(Business.id == business_id).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     
-    # Get analysis
-    analysis = db.query(SEOAnalysis).filter(
-        SEOAnalysis.business_id == business_id
-    ).first()
-    
+    analysis = business.SEOAnalysis
     if not analysis:
         raise HTTPException(
             status_code=404,
@@ -147,29 +136,35 @@ def get_seo_analysis(business_id: int, db: Session = Depends(get_db)):
 @router.get("/issues/{business_id}")
 def get_seo_issues(business_id: int, db: Session = Depends(get_db)):
     """Get prioritized SEO issues for a business."""
-    # Get the business
-    business = db.query(Business).filter(Business.id == business_id).first()
+    # Get the business and its analysis in one query
+    business = db.query(Business.name, Business.website, SEOAnalysis).outerjoin(
+        SEOAnalysis, SEOAnalysis.business_id == Business.id
+    ).filter(Business.id == business_id).first()
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
     
-    # Get analysis
-    analysis = db.query(SEOAnalysis).filter(
-        SEOAnalysis.business_id == business_id
-    ).first()
-    
+    analysis = business.SEOAnalysis
     if not analysis:
         raise HTTPException(
             status_code=404,
             detail="No SEO analysis found. Run POST /api/seo/analyze/{id} first."
         )
     
-    issues = json.loads(analysis.issues) if analysis.issues else []
-    recommendations = json.loads(analysis.recommendations) if analysis.recommendations else []
+    issues = analysis.issues or []
+    recommendations = analysis.recommendations or []
+    
+    # Group issues by severity in a single pass
+    by_severity = defaultdict(list)
+    for issue in issues:
+        by_severity[issue.get("severity")].append(issue)
+    critical = by_severity["critical"]
+    warnings = by_severity["warning"]
+    info = by_severity["info"]
     
-    # Group issues by severity
-    critical = [i for i in issues if i.get("severity") == "critical"]
-    warnings = [i for i in issues if i.get("severity") == "warning"]
-    info = [i for i in issues if i.get("severity") == "info"]
+    # Counts stored at analysis time; rows saved before they existed have none
+    counts = (analysis.critical_count, analysis.warning_count, analysis.info_count)
+    if None in counts:
+        counts = (len(critical), len(warnings), len(info))
     
     return {
         "business_id": business_id,
@@ -177,9 +172,9 @@ def get_seo_issues(business_id: int, db: Session = Depends(get_db)):
         "overall_score": analysis.overall_score,
         "grade": analysis.grade,
         "summary": {
-            "critical_count": len(critical),
-            "warning_count": len(warnings),
-            "info_count": len(info),
+            "critical_count": counts[0],
+            "warning_count": counts[1],
+            "info_count": counts[2],
             "total_issues": len(issues)
         },
         "critical_issues": critical,
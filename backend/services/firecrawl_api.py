@@ -1,13 +1,106 @@
 """Firecrawl API integration for company research and website scraping."""
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
-from typing import Optional
+import re
+import time
+import zlib
+from datetime import datetime, timedelta
+from functools import cached_property
+from typing import Optional, TYPE_CHECKING
+import httpx
+import orjson
+from lxml import etree
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from services.html_parser import parse_html
+
+if TYPE_CHECKING:
+    from lxml.html import HtmlElement
 
 logger = logging.getLogger(__name__)
 
+# Longest markdown kept from a scrape (stored as CompanyResearch.raw_markdown)
+MAX_MARKDOWN_CHARS = 50000
+
+# Firecrawl REST endpoint used directly by the async batch scraper
+FIRECRAWL_SCRAPE_URL = "https://api.firecrawl.dev/v1/scrape"
+
+# Content requested from Firecrawl unless the caller asks for less
+DEFAULT_SCRAPE_FORMATS = ("markdown", "html")
+
+# Patterns used by extract_company_info, compiled once at import.
+# Emails and phones share one alternation so the HTML is scanned in a single
+# pass. Each branch may only start where its run of local-part characters or
+# digits starts; otherwise a long run with no "@" (base64, minified JS, IDs)
+# is rescanned from every offset, which is quadratic.
+_CONTACT_RE = re.compile(
+    r"(?P<email>(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"
+    r"|(?P<phone>(?<!\d)[\+]?[(]?[0-9]{1,3}[)]?[-\s\.]?[(]?[0-9]{1,4}[)]?[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,9}(?!\d))"
+)
+# Placeholder addresses that are never real contacts
+_EXCLUDED_EMAIL_RE = re.compile(r"(?:example|domain|email|test)\.com", re.IGNORECASE)
+_SOCIAL_RES = {
+    "facebook": re.compile(r"facebook\.com", re.IGNORECASE),
+    "twitter": re.compile(r"twitter\.com|x\.com", re.IGNORECASE),
+    "linkedin": re.compile(r"linkedin\.com", re.IGNORECASE),
+    "instagram": re.compile(r"instagram\.com", re.IGNORECASE),
+    "youtube": re.compile(r"youtube\.com", re.IGNORECASE),
+}
+# Every <a href> value, as plain strings so results don't pin the tree
+_XP_LINK_HREFS = etree.XPath("//a/@href", smart_strings=False)
+_TECH_SIGNATURES = {
+    "WordPress": ["wp-content", "wp-includes", "wordpress"],
+    "Shopify": ["shopify", "cdn.shopify"],
+    "Wix": ["wix.com", "wixsite"],
+    "Squarespace": ["squarespace"],
+    "React": ["react", "__next"],
+    "Vue.js": ["vue", "nuxt"],
+    "jQuery": ["jquery"],
+    "Bootstrap": ["bootstrap"],
+    "Google Analytics": ["google-analytics", "gtag"],
+    "Google Tag Manager": ["googletagmanager"],
+    "Facebook Pixel": ["facebook.net/en_US/fbevents"],
+}
+
+
+def _tech_needles(signatures: dict[str, list[str]]) -> dict[str, tuple[str, ...]]:
+    """
+    Prepare technology signatures for matching against lowercased HTML.
+    
+    Signatures are lowercased, and any signature containing a shorter one
+    for the same technology is dropped since it can never add a match.
+    """
+    needles = {}
+    for tech, sigs in signatures.items():
+        lowered = list(dict.fromkeys(sig.lower() for sig in sigs))
+        needles[tech] = tuple(
+            sig for sig in lowered
+            if not any(other != sig and other in sig for other in lowered)
+        )
+    return needles
+
+
+_TECH_NEEDLES = _tech_needles(_TECH_SIGNATURES)
+
+# Usage stats keyed by (month, minute) so frequent polls skip the database.
+# Cleared whenever credits are recorded.
+_usage_stats_cache: dict[tuple[str, int], dict] = {}
+
+
+def _cache_key(url: str) -> str:
+    """
+    ScrapeCache key for `url`.
+    
+    Formats are stored with the entry rather than in the key, so a scrape in
+    more formats (e.g. company research) also serves requests for fewer
+    (e.g. SEO analysis's html only).
+    """
+    return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
 
 class FirecrawlError(Exception):
     """Custom exception for Firecrawl API errors."""
@@ -27,67 +120,192 @@ class FirecrawlService:
         if not settings.FIRECRAWL_API_KEY:
             raise FirecrawlError("Firecrawl API key not configured")
         
+        # This month's credit count, read once and then kept current locally;
+        # credits not yet written to the database accumulate in _pending_credits
+        self._usage_month: Optional[str] = None
+        self._usage_count = 0
+        self._pending_credits = 0
+    
+    @cached_property
+    def client(self):
+        """Firecrawl client, created on first scrape (usage reads don't need it)."""
         # Import here to avoid issues if firecrawl not installed
         from firecrawl import Firecrawl
-        self.client = Firecrawl(api_key=settings.FIRECRAWL_API_KEY)
+        return Firecrawl(api_key=settings.FIRECRAWL_API_KEY)
     
-    def _get_current_month(self) -> str:
-        """Get current month string for tracking."""
-        return datetime.utcnow().strftime("%Y-%m")
+    def _get_current_month(self, now: Optional[datetime] = None) -> str:
+        """Get current month string for tracking (for `now`, if given)."""
+        now = now or datetime.utcnow()
+        return f"{now.year:04d}-{now.month:02d}"
     
-    def _check_usage_limit(self) -> tuple[int, int]:
-        """Check if we're within usage limits. Returns (current_count, limit)."""
+    def _load_usage(self, now: Optional[datetime] = None) -> int:
+        """Credits used this month, queried once per month per service instance."""
         from app.database import FirecrawlUsage
         
-        month = self._get_current_month()
-        usage = self.db.query(FirecrawlUsage).filter(
-            FirecrawlUsage.month == month
-        ).first()
+        month = self._get_current_month(now)
+        if self._usage_month != month:
+            # Pending credits belong to the month they were spent in
+            self.flush_usage()
+            self._usage_count = self.db.query(FirecrawlUsage.credit_count).filter(
+                FirecrawlUsage.month == month
+            ).scalar() or 0
+            self._usage_month = month
+        return self._usage_count
+    
+    def _check_usage_limit(self, now: Optional[datetime] = None) -> tuple[int, int]:
+        """Check if we're within usage limits. Returns (current_count, limit)."""
+        return self._load_usage(now), settings.FIRECRAWL_MONTHLY_LIMIT
+    
+    def _increment_usage(self, credits: int = 1, flush: bool = True, now: Optional[datetime] = None):
+        """
+        Record spent credits.
         
-        current_count = usage.credit_count if usage else 0
-        return current_count, settings.FIRECRAWL_MONTHLY_LIMIT
+        Args:
+            credits: Number of credits spent
+            flush: Write to the database now; otherwise the credits are held
+                until flush_usage() is called
+            now: Time the credits were spent (defaults to the current time)
+        """
+        self._load_usage(now)
+        self._usage_count += credits
+        self._pending_credits += credits
+        if flush:
+            self.flush_usage()
     
-    def _increment_usage(self, credits: int = 1):
-        """Increment usage counter."""
-        from app.database import FirecrawlUsage
+    def flush_usage(self):
+        """
+        Write pending credits.
         
-        month = self._get_current_month()
-        usage = self.db.query(FirecrawlUsage).filter(
-            FirecrawlUsage.month == month
-        ).first()
+        A single upsert on the month's unique index adds them in SQL, so
+        concurrent writers (including two creating the month's row) can
+        neither lose an update nor hit a duplicate-key error.
+        """
+        from app.database import FirecrawlUsage
         
-        if usage:
-            usage.credit_count += credits
-            usage.last_updated = datetime.utcnow()
-        else:
-            usage = FirecrawlUsage(month=month, credit_count=credits)
-            self.db.add(usage)
+        if not self._pending_credits:
+            return
+        credits, self._pending_credits = self._pending_credits, 0
         
+        stmt = sqlite_insert(FirecrawlUsage).values(month=self._usage_month, credit_count=credits)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FirecrawlUsage.month],
+            set_={
+                "credit_count": FirecrawlUsage.credit_count + stmt.excluded.credit_count,
+                "last_updated": func.current_timestamp(),
+            }
+        )
+        self.db.execute(stmt)
         self.db.commit()
+        _usage_stats_cache.clear()
     
-    def get_usage_stats(self) -> dict:
-        """Get current Firecrawl usage statistics."""
-        current, limit = self._check_usage_limit()
+    def _get_cached_scrapes(
+        self,
+        urls: list[str],
+        formats: tuple[str, ...],
+        now: Optional[datetime] = None
+    ) -> dict[str, dict]:
+        """Unexpired cached scrape results for `urls` holding all `formats`, keyed by URL."""
+        from app.database import ScrapeCache
+        
+        if settings.FIRECRAWL_CACHE_TTL_HOURS <= 0:
+            return {}
+        
+        keys = {_cache_key(url): url for url in urls}
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.FIRECRAWL_CACHE_TTL_HOURS)
+        rows = self.db.query(ScrapeCache.key, ScrapeCache.formats, ScrapeCache.payload).filter(
+            ScrapeCache.key.in_(list(keys)),
+            ScrapeCache.created_at >= cutoff
+        ).all()
+        requested = set(formats)
         return {
-            "month": self._get_current_month(),
-            "credits_used": current,
-            "credits_limit": limit,
-            "credits_remaining": max(0, limit - current),
-            "percentage_used": round((current / limit) * 100, 1) if limit > 0 else 0
+            keys[key]: orjson.loads(zlib.decompress(payload))
+            for key, stored_formats, payload in rows
+            if requested.issubset((stored_formats or "").split(","))
         }
     
-    def scrape_website(self, url: str) -> dict:
+    def _cache_scrapes(self, results: list[dict], formats: tuple[str, ...], now: Optional[datetime] = None):
+        """
+        Store scrape results in the cache, dropping expired entries.
+        
+        Not committed here: every stored result also spent a credit, so the
+        rows are committed by the flush_usage() that follows.
+        """
+        from app.database import ScrapeCache
+        
+        if not results or settings.FIRECRAWL_CACHE_TTL_HOURS <= 0:
+            return
+        
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.FIRECRAWL_CACHE_TTL_HOURS)
+        self.db.execute(delete(ScrapeCache).where(ScrapeCache.created_at < cutoff))
+        
+        stmt = sqlite_insert(ScrapeCache)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScrapeCache.key],
+            set_={
+                "url": stmt.excluded.url,
+                "formats": stmt.excluded.formats,
+                "payload": stmt.excluded.payload,
+                "created_at": func.current_timestamp(),
+            }
+        )
+        self.db.execute(stmt, [
+            {
+                "key": _cache_key(result["url"]),
+                "url": result["url"],
+                "formats": ",".join(sorted(formats)),
+                # The parsed tree is rebuilt on read rather than stored
+                "payload": zlib.compress(orjson.dumps(
+                    {k: v for k, v in result.items() if k != "tree"}, default=str
+                ), 6),
+            }
+            for result in results
+        ])
+    
+    def get_usage_stats(self, now: Optional[datetime] = None) -> dict:
+        """Get current Firecrawl usage statistics (cached for up to a minute)."""
+        key = (self._get_current_month(now), int(time.time() // 60))
+        stats = _usage_stats_cache.get(key)
+        if stats is None:
+            current, limit = self._check_usage_limit(now)
+            stats = {
+                "month": key[0],
+                "credits_used": current,
+                "credits_limit": limit,
+                "credits_remaining": max(0, limit - current),
+                "percentage_used": round((current / limit) * 100, 1) if limit > 0 else 0
+            }
+            _usage_stats_cache.clear()
+            _usage_stats_cache[key] = stats
+        return dict(stats)
+    
+    def scrape_website(self, url: str, formats: tuple[str, ...] = DEFAULT_SCRAPE_FORMATS) -> dict:
         """
         Scrape a website using Firecrawl.
         
+        Pages scraped within the last FIRECRAWL_CACHE_TTL_HOURS are served
+        from the scrape cache without spending a credit.
+        
         Args:
             url: The website URL to scrape
+            formats: Firecrawl formats to request; ask only for what the
+                caller uses (e.g. ("html",) for SEO analysis)
             
         Returns:
-            Dictionary with scraped content and metadata
+            Dictionary with scraped content and metadata, plus the page
+            parsed once by parse_html() under "tree"
         """
+        # One timestamp for the cache cutoff, usage month and scraped_at, so
+        # they agree even when a scrape straddles midnight at month end
+        now = datetime.utcnow()
+        
+        cached = self._get_cached_scrapes([url], formats, now).get(url)
+        if cached is not None:
+            cached["tree"] = parse_html(cached["html"])
+            cached["usage"] = self.get_usage_stats(now)
+            return cached
+        
         # Check usage limit
-        current, limit = self._check_usage_limit()
+        current, limit = self._check_usage_limit(now)
         if current >= limit:
             raise FirecrawlLimitExceeded(
                 f"Monthly Firecrawl limit reached ({current}/{limit}). "
@@ -98,13 +316,13 @@ class FirecrawlService:
             # Scrape the website
             result = self.client.scrape(
                 url,
-                formats=['markdown', 'html'],
+                formats=list(formats),
                 only_main_content=True,
                 wait_for=2000,  # Wait for JS to render
             )
             
-            # Increment usage
-            self._increment_usage(1)
+            # Increment usage (written with the cache entry, below)
+            self._increment_usage(1, flush=False, now=now)
             
             # Handle both dict and Pydantic model responses
             if hasattr(result, 'model_dump'):
@@ -112,105 +330,176 @@ class FirecrawlService:
             elif hasattr(result, '__dict__') and not isinstance(result, dict):
                 result = vars(result)
             
-            # Extract relevant data
-            metadata = result.get("metadata", {}) or {}
-            if hasattr(metadata, 'model_dump'):
-                metadata = metadata.model_dump()
-            elif hasattr(metadata, '__dict__') and not isinstance(metadata, dict):
-                metadata = vars(metadata)
-            
-            return {
-                "success": True,
-                "url": url,
-                "title": metadata.get("title", "") or "",
-                "description": metadata.get("description", "") or "",
-                "markdown": result.get("markdown", "") or "",
-                "html": result.get("html", "") or "",
-                "metadata": metadata,
-                "scraped_at": datetime.utcnow().isoformat(),
-                "usage": self.get_usage_stats()
-            }
+            scraped = self._build_scrape_result(url, result, now)
+            self._cache_scrapes([scraped], formats, now)
             
         except Exception as e:
             logger.error(f"Firecrawl scrape failed for {url}: {e}")
             raise FirecrawlError(f"Failed to scrape website: {str(e)}")
+        finally:
+            self.flush_usage()
+        
+        scraped["tree"] = parse_html(scraped["html"])
+        scraped["usage"] = self.get_usage_stats(now)
+        return scraped
+    
+    async def scrape_many(
+        self,
+        urls: list[str],
+        concurrency: int = 20,
+        formats: tuple[str, ...] = DEFAULT_SCRAPE_FORMATS
+    ) -> list:
+        """
+        Scrape several websites concurrently.
+        
+        Requests go straight to Firecrawl's REST endpoint over one pooled
+        async HTTP client, with at most `concurrency` in flight. Cached pages
+        and repeated URLs are not scraped (or charged) again. Fresh results
+        share the batch's start time as their scraped_at.
+        
+        Args:
+            urls: The website URLs to scrape
+            concurrency: Maximum number of simultaneous scrapes
+            formats: Firecrawl formats to request (see scrape_website())
+            
+        Returns:
+            One entry per URL, in order: the scrape_website()-style dict, or
+            the FirecrawlError raised for that URL
+        """
+        # One timestamp for the whole batch (see scrape_website())
+        now = datetime.utcnow()
+        
+        cached = self._get_cached_scrapes(urls, formats, now)
+        pending = [url for url in dict.fromkeys(urls) if url not in cached]
+        
+        current, limit = self._check_usage_limit(now)
+        if current + len(pending) > limit:
+            raise FirecrawlLimitExceeded(
+                f"Not enough Firecrawl credits for {len(pending)} scrapes ({current}/{limit}). "
+                f"Limit resets next month."
+            )
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def scrape_one(client: httpx.AsyncClient, url: str) -> dict:
+            try:
+                async with semaphore:
+                    response = await client.post(FIRECRAWL_SCRAPE_URL, json={
+                        "url": url,
+                        "formats": list(formats),
+                        "onlyMainContent": True,
+                        "waitFor": 2000,  # Wait for JS to render
+                    })
+                response.raise_for_status()
+                payload = response.json()
+                if not payload.get("success"):
+                    raise FirecrawlError(payload.get("error") or "Scrape unsuccessful")
+            except Exception as e:
+                logger.error(f"Firecrawl scrape failed for {url}: {e}")
+                raise FirecrawlError(f"Failed to scrape website: {str(e)}")
+            self._increment_usage(1, flush=False, now=now)
+            return self._build_scrape_result(url, payload.get("data") or {}, now)
+        
+        try:
+            async with httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {settings.FIRECRAWL_API_KEY}"},
+                limits=httpx.Limits(max_connections=concurrency),
+                timeout=httpx.Timeout(60.0),
+            ) as client:
+                scraped = await asyncio.gather(
+                    *(scrape_one(client, url) for url in pending),
+                    return_exceptions=True
+                )
+            self._cache_scrapes([r for r in scraped if not isinstance(r, BaseException)], formats, now)
+        finally:
+            # One write for the whole batch, even if it was cancelled midway
+            self.flush_usage()
+        
+        fetched = dict(zip(pending, scraped))
+        fetched.update(cached)
+        for result in fetched.values():
+            if not isinstance(result, BaseException):
+                result["tree"] = parse_html(result["html"])
+        return [fetched[url] for url in urls]
     
-    def extract_company_info(self, scraped_data: dict) -> dict:
+    def _build_scrape_result(self, url: str, result: dict, now: Optional[datetime] = None) -> dict:
+        """Normalize a Firecrawl scrape response into the dict callers consume."""
+        metadata = result.get("metadata", {}) or {}
+        if hasattr(metadata, 'model_dump'):
+            metadata = metadata.model_dump()
+        elif hasattr(metadata, '__dict__') and not isinstance(metadata, dict):
+            metadata = vars(metadata)
+        
+        markdown = result.get("markdown", "") or ""
+        if len(markdown) > MAX_MARKDOWN_CHARS:
+            markdown = markdown[:MAX_MARKDOWN_CHARS]
+        
+        return {
+            "success": True,
+            "url": url,
+            "title": metadata.get("title", "") or "",
+            "description": metadata.get("description", "") or "",
+            "markdown": markdown,
+            "html": result.get("html", "") or "",
+            "metadata": metadata,
+            "scraped_at": (now or datetime.utcnow()).isoformat(),
+        }
+    
+    def extract_company_info(self, scraped_data: dict, tree: Optional["HtmlElement"] = None) -> dict:
         """
         Extract company information from scraped website data.
         
         Args:
             scraped_data: Data returned from scrape_website()
+            tree: Already-parsed HTML (see parse_html()); defaults to
+                scraped_data["tree"], and is parsed here if neither is given
             
         Returns:
             Dictionary with extracted company information
         """
-        from bs4 import BeautifulSoup
-        import re
-        
         html = scraped_data.get("html", "")
         metadata = scraped_data.get("metadata", {})
         
-        soup = BeautifulSoup(html, "lxml") if html else None
+        if tree is None:
+            tree = scraped_data.get("tree")
+        if tree is None:
+            tree = parse_html(html)
         
         # Extract social media links
         social_links = {}
-        if soup:
-            social_patterns = {
-                "facebook": r"facebook\.com",
-                "twitter": r"(twitter\.com|x\.com)",
-                "linkedin": r"linkedin\.com",
-                "instagram": r"instagram\.com",
-                "youtube": r"youtube\.com",
-            }
-            
-            for link in soup.find_all("a", href=True):
-                href = link["href"].lower()
-                for platform, pattern in social_patterns.items():
-                    if re.search(pattern, href) and platform not in social_links:
-                        social_links[platform] = link["href"]
+        if tree is not None:
+            for href in _XP_LINK_HREFS(tree):
+                for platform, pattern in _SOCIAL_RES.items():
+                    if platform not in social_links and pattern.search(href):
+                        social_links[platform] = href
+                if len(social_links) == len(_SOCIAL_RES):
+                    break  # Every platform found; skip the remaining links
         
-        # Extract email addresses
+        # Extract email addresses and phone numbers in one scan
         emails = []
-        if html:
-            email_pattern = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-            found_emails = re.findall(email_pattern, html)
-            # Filter out common non-contact emails
-            exclude_patterns = ["example.com", "domain.com", "email.com", "test.com"]
-            emails = list(set([
-                e for e in found_emails 
-                if not any(p in e.lower() for p in exclude_patterns)
-            ]))[:5]  # Limit to 5 emails
-        
-        # Extract phone numbers
         phones = []
         if html:
-            phone_pattern = r"[\+]?[(]?[0-9]{1,3}[)]?[-\s\.]?[(]?[0-9]{1,4}[)]?[-\s\.]?[0-9]{1,4}[-\s\.]?[0-9]{1,9}"
-            found_phones = re.findall(phone_pattern, html)
-            phones = list(set([
-                p.strip() for p in found_phones 
+            found = {"email": [], "phone": []}
+            for match in _CONTACT_RE.finditer(html):
+                found[match.lastgroup].append(match.group())
+            
+            # Filter out common non-contact emails; de-duplicate keeping
+            # first-seen order, so the limits keep the earliest matches
+            emails = list(dict.fromkeys(
+                e for e in found["email"]
+                if not _EXCLUDED_EMAIL_RE.search(e)
+            ))[:5]  # Limit to 5 emails
+            
+            phones = list(dict.fromkeys(
+                p.strip() for p in found["phone"]
                 if len(p.replace(" ", "").replace("-", "")) >= 10
-            ]))[:3]  # Limit to 3 phones
+            ))[:3]  # Limit to 3 phones
         
         # Detect technologies (basic detection)
         technologies = []
-        tech_signatures = {
-            "WordPress": ["wp-content", "wp-includes", "wordpress"],
-            "Shopify": ["shopify", "cdn.shopify"],
-            "Wix": ["wix.com", "wixsite"],
-            "Squarespace": ["squarespace"],
-            "React": ["react", "__next"],
-            "Vue.js": ["vue", "nuxt"],
-            "jQuery": ["jquery"],
-            "Bootstrap": ["bootstrap"],
-            "Google Analytics": ["google-analytics", "gtag"],
-            "Google Tag Manager": ["googletagmanager"],
-            "Facebook Pixel": ["facebook.net/en_US/fbevents"],
-        }
-        
         html_lower = html.lower() if html else ""
-        for tech, signatures in tech_signatures.items():
-            if any(sig in html_lower for sig in signatures):
+        for tech, needles in _TECH_NEEDLES.items():
+            if any(needle in html_lower for needle in needles):
                 technologies.append(tech)
         
         return {
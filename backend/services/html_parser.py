@@ -0,0 +1,37 @@
+"""Shared HTML parsing for company research and SEO analysis."""
+from typing import Optional, Union
+import lxml.html
+from lxml import etree
+
+
+def parse_html(html: Union[str, bytes]) -> Optional[lxml.html.HtmlElement]:
+    """
+    Parse HTML once so the result can be shared between consumers.
+
+    Both FirecrawlService.extract_company_info() and SEOAnalyzer accept the
+    returned tree, which avoids building the same DOM twice for one page.
+    Consumers must treat it as read-only.
+
+    Args:
+        html: Raw HTML content of the page. Bytes are read as UTF-8, or if
+            they are not valid UTF-8, in the encoding the page declares
+
+    Returns:
+        Root <html> element of the parsed document, or None if there is no HTML
+    """
+    if not html:
+        return None
+    if isinstance(html, bytes):
+        try:
+            html = html.decode("utf-8")
+        except UnicodeDecodeError:
+            pass  # lxml picks the encoding from a BOM or <meta charset>
+    try:
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input carrying an XML encoding declaration
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        # Nothing parseable, e.g. a whitespace-only document
+        return None
@@ -2,8 +2,9 @@
 import googlemaps
 import logging
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-import json
 
 from app.config import settings
 from app.database import APIUsage, Business, Search
@@ -43,17 +44,22 @@ class PlacesService:
         return current_count, settings.MONTHLY_API_LIMIT
     
     def _increment_api_usage(self, count: int = 1):
-        """Increment API usage counter."""
-        month = self._get_current_month()
-        usage = self.db.query(APIUsage).filter(APIUsage.month == month).first()
-        
-        if usage:
-            usage.call_count += count
-            usage.last_updated = datetime.utcnow()
-        else:
-            usage = APIUsage(month=month, call_count=count)
-            self.db.add(usage)
+        """
+        Increment API usage counter.
         
+        A single upsert on the month's unique index adds the calls in SQL,
+        so concurrent searches (including two creating the month's row) can
+        neither lose an update nor hit a duplicate-key error.
+        """
+        stmt = sqlite_insert(APIUsage).values(month=self._get_current_month(), call_count=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[APIUsage.month],
+            set_={
+                "call_count": APIUsage.call_count + stmt.excluded.call_count,
+                "last_updated": func.current_timestamp(),
+            }
+        )
+        self.db.execute(stmt)
         self.db.commit()
     
     def get_usage_stats(self) -> dict:
@@ -171,11 +177,12 @@ class PlacesService:
                 website=details.get("website") if details else None,
                 rating=place.get("rating"),
                 review_count=place.get("user_ratings_total"),
-                business_types=json.dumps(place.get("types", [])),
+                business_types=place.get("types", []),
                 latitude=place.get("geometry", {}).get("location", {}).get("lat"),
                 longitude=place.get("geometry", {}).get("location", {}).get("lng"),
                 search_id=search_record.id
             )
+            business.lead_score = business.calculate_lead_score()
             self.db.add(business)
             businesses.append(business.to_dict())
         
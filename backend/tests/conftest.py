@@ -0,0 +1,10 @@
+"""Shared test setup."""
+import os
+import tempfile
+from pathlib import Path
+
+# Point the app at a throwaway SQLite file before any test imports it, so the
+# suite never reads or writes the real leads.db (settings read DATABASE_URL at
+# import time, and load_dotenv does not override variables already set)
+_db_dir = tempfile.TemporaryDirectory(prefix="lead-gen-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_db_dir.name) / 'test.db'}"
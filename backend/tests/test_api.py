@@ -1,4 +1,7 @@
 """Integration tests for API endpoints."""
+import dataclasses
+import json
+import orjson
 import pytest
 import sys
 from pathlib import Path
@@ -9,13 +12,22 @@ sys.path.insert(0, str(backend_dir))
 
 from fastapi.testclient import TestClient
 from app.main import app
-from app.database import init_db, SessionLocal, Business, Search, APIUsage
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+import app.database as database
+import services.firecrawl_api as firecrawl_api
+from app.database import (
+    init_db, SessionLocal, Business, Search, APIUsage, CompanyResearch,
+    FirecrawlUsage, ScrapeCache, SEOAnalysis
+)
 
 
 @pytest.fixture
 def client():
-    """Create test client."""
-    return TestClient(app)
+    """Create test client (runs the app lifespan so tables exist)."""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
@@ -98,6 +110,37 @@ class TestBusinessesEndpoint:
         response = client.get("/api/businesses?offset=10")
         data = response.json()
         assert data["offset"] == 10
+    
+    def test_list_businesses_matches_to_dict(self, client, db_session):
+        """Rows serialized by SQLite should match to_dict(), highest lead score first."""
+        businesses = [
+            Business(place_id="test-rows-1", name="Café Zoë", website="https://cafe.test",
+                     rating=4.3, review_count=12, business_types=None,
+                     latitude=-33.92487, longitude=18.42406, search_id=-2),
+            Business(place_id="test-rows-2", name="Ōsaka Sushi — 寿司", phone="+27 21 555 0000",
+                     rating=4.0, review_count=250, business_types=["restaurant", "food"],
+                     latitude=-33.9248685, longitude=1e-7, search_id=-2),
+            Business(place_id="test-rows-3", name="Plain Plumbing", business_types=[],
+                     search_id=-2),
+        ]
+        for business in businesses:
+            business.lead_score = business.calculate_lead_score()
+        db_session.add_all(businesses)
+        db_session.commit()
+        try:
+            response = client.get("/api/businesses?search_id=-2&sort_by=lead_score")
+            data = response.json()
+            
+            expected = sorted(businesses, key=lambda b: b.lead_score, reverse=True)
+            assert [b["id"] for b in data["businesses"]] == [b.id for b in expected]
+            scores = [b["lead_score"] for b in data["businesses"]]
+            assert scores == sorted(scores, reverse=True)
+            for returned, business in zip(data["businesses"], expected):
+                assert returned == orjson.loads(orjson.dumps(business.to_dict()))
+        finally:
+            for business in businesses:
+                db_session.delete(business)
+            db_session.commit()
 
 
 class TestBusinessStatsEndpoint:
@@ -169,6 +212,151 @@ class TestSearchEndpoint:
             "max_results": 0
         })
         assert response.status_code == 422  # Validation error
+    
+    def test_history_lists_newest_first(self, client, db_session):
+        """Searches in the same second, or after a legacy row with microseconds, come first."""
+        db_session.execute(text(
+            "INSERT INTO searches (query, location, created_at) "
+            "VALUES ('legacy', 'Cape Town', strftime('%Y-%m-%d %H:%M:%f', 'now') || '999')"
+        ))
+        db_session.commit()
+        searches = [Search(query=f"new {i}", location="Cape Town") for i in range(2)]
+        for search in searches:
+            db_session.add(search)
+            db_session.commit()
+        try:
+            history = client.get("/api/search/history?limit=3").json()
+            assert [s["query"] for s in history] == ["new 1", "new 0", "legacy"]
+        finally:
+            db_session.query(Search).filter(Search.location == "Cape Town").delete()
+            db_session.commit()
+
+
+class TestCompanyResearchStorage:
+    """Test JSON fields on stored company research."""
+    
+    def test_json_fields_stored_once_encoded(self, db_session):
+        """Lists/dicts should be stored as plain JSON and read back as objects."""
+        research = CompanyResearch(
+            business_id=-1,
+            emails=["info@acme.test"],
+            social_links={"facebook": "https://facebook.com/acme"}
+        )
+        db_session.add(research)
+        db_session.commit()
+        try:
+            raw = db_session.execute(
+                text("SELECT emails FROM company_research WHERE business_id = -1")
+            ).scalar()
+            assert json.loads(raw) == ["info@acme.test"]
+            
+            db_session.expire_all()
+            result = db_session.get(CompanyResearch, research.id).to_dict()
+            assert result["emails"] == ["info@acme.test"]
+            assert result["social_links"] == {"facebook": "https://facebook.com/acme"}
+            assert result["phones"] == []
+        finally:
+            db_session.delete(research)
+            db_session.commit()
+    
+    def test_timestamp_set_on_table_without_column_default(self):
+        """Tables created before the timestamp defaults still get one on insert."""
+        legacy_engine = create_engine("sqlite://")
+        with legacy_engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE company_research (id INTEGER PRIMARY KEY, business_id INTEGER, "
+                "scraped_at DATETIME, page_title VARCHAR, meta_description TEXT, emails JSON, "
+                "phones JSON, social_links JSON, technologies JSON, raw_markdown TEXT)"
+            ))
+        with Session(legacy_engine, expire_on_commit=False) as session:
+            research = CompanyResearch(business_id=1)
+            session.add(research)
+            session.commit()
+            assert research.scraped_at is not None
+
+
+class TestLegacyDatabaseUpgrade:
+    """Test upgrading databases created before the unique indexes existed."""
+    
+    def test_duplicates_merged_before_unique_indexes(self, monkeypatch):
+        """Usage counters should be summed and the newest research row kept."""
+        legacy_engine = create_engine("sqlite://")
+        database.Base.metadata.create_all(bind=legacy_engine)
+        with legacy_engine.begin() as conn:
+            for name in database._UNIQUE_INDEX_MERGES:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text(
+                "INSERT INTO firecrawl_usage (month, credit_count) "
+                "VALUES ('2024-01', 3), ('2024-01', 4), ('2024-02', 1)"
+            ))
+            conn.execute(text(
+                "INSERT INTO company_research (business_id, page_title) "
+                "VALUES (1, 'old'), (1, 'new'), (NULL, 'a'), (NULL, 'b')"
+            ))
+        monkeypatch.setattr(database, "engine", legacy_engine)
+        
+        database._create_missing_indexes()
+        
+        with legacy_engine.connect() as conn:
+            usage = conn.execute(text(
+                "SELECT month, credit_count FROM firecrawl_usage ORDER BY month"
+            )).all()
+            titles = conn.execute(text(
+                "SELECT page_title FROM company_research WHERE business_id = 1"
+            )).scalars().all()
+            unlinked = conn.execute(text(
+                "SELECT COUNT(*) FROM company_research WHERE business_id IS NULL"
+            )).scalar()
+        assert usage == [("2024-01", 7), ("2024-02", 1)]
+        assert titles == ["new"]
+        assert unlinked == 2
+        indexes = {i["name"] for i in inspect(legacy_engine).get_indexes("firecrawl_usage")}
+        assert "uq_firecrawl_usage_month" in indexes
+
+
+class TestResearchAndSEOEndpoints:
+    """Test research and SEO analysis of the same business."""
+    
+    def test_seo_after_research_reuses_the_scrape(self, client, db_session, monkeypatch):
+        """SEO analysis should be served by the research scrape, spending one credit in total."""
+        class StubClient:
+            calls = []
+            
+            def scrape(self, url, formats, **kwargs):
+                StubClient.calls.append(tuple(formats))
+                return {
+                    "html": "<html><head><title>Acme</title></head><body><h1>Acme</h1></body></html>",
+                    "markdown": "# Acme",
+                    "metadata": {"title": "Acme"},
+                }
+        
+        monkeypatch.setattr(
+            firecrawl_api, "settings",
+            dataclasses.replace(firecrawl_api.settings, FIRECRAWL_API_KEY="test-key")
+        )
+        monkeypatch.setattr(firecrawl_api.FirecrawlService, "client", StubClient())
+        business = Business(place_id="test-research-seo", name="Acme", website="https://research-seo.test")
+        db_session.add(business)
+        db_session.commit()
+        month = firecrawl_api.FirecrawlService(db_session)._get_current_month()
+        db_session.query(FirecrawlUsage).filter(FirecrawlUsage.month == month).delete()
+        db_session.commit()
+        try:
+            assert client.post(f"/api/research/{business.id}").status_code == 200
+            assert client.post(f"/api/seo/analyze/{business.id}").status_code == 200
+            
+            assert StubClient.calls == [("markdown", "html")]
+            credits = db_session.query(FirecrawlUsage.credit_count).filter(
+                FirecrawlUsage.month == month
+            ).scalar()
+            assert credits == 1
+        finally:
+            db_session.query(CompanyResearch).filter(CompanyResearch.business_id == business.id).delete()
+            db_session.query(SEOAnalysis).filter(SEOAnalysis.business_id == business.id).delete()
+            db_session.query(ScrapeCache).filter(ScrapeCache.url == business.website).delete()
+            db_session.query(FirecrawlUsage).filter(FirecrawlUsage.month == month).delete()
+            db_session.delete(business)
+            db_session.commit()
 
 
 class TestRateLimiter:
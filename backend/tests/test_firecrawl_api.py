@@ -0,0 +1,214 @@
+"""Unit tests for the Firecrawl service."""
+import asyncio
+import dataclasses
+import json
+import time
+import httpx
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import event
+
+import services.firecrawl_api as firecrawl_api
+from app.database import init_db, SessionLocal, FirecrawlUsage, ScrapeCache
+from services.firecrawl_api import FirecrawlError, FirecrawlLimitExceeded, FirecrawlService, _cache_key
+
+
+@pytest.fixture
+def db_session():
+    """Create database session for testing."""
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def firecrawl_service(db_session, monkeypatch):
+    """FirecrawlService with a dummy API key (no requests are made)."""
+    monkeypatch.setattr(
+        firecrawl_api, "settings",
+        dataclasses.replace(firecrawl_api.settings, FIRECRAWL_API_KEY="test-key")
+    )
+    return FirecrawlService(db_session)
+
+
+class TestCompanyInfoExtraction:
+    """Test company info extracted from scraped HTML."""
+    
+    def test_extracts_contacts_and_social_links(self, firecrawl_service):
+        """Emails, phones and social profiles should be found in the HTML."""
+        html = (
+            '<html><body><a href="https://facebook.com/acme">FB</a>'
+            '<p>Email info@acme.co.za or call +27 21 555 1234</p>'
+            '<p>Not this: someone@example.com</p></body></html>'
+        )
+        info = firecrawl_service.extract_company_info({"html": html})
+        assert info["social_links"] == {"facebook": "https://facebook.com/acme"}
+        assert info["emails"] == ["info@acme.co.za"]
+        assert info["phones"] == ["+27 21 555 1234"]
+    
+    def test_emails_deduplicated_in_page_order(self, firecrawl_service):
+        """Repeated emails count once and the first five distinct ones are kept."""
+        addresses = [f"person{i}@acme.co.za" for i in range(7)]
+        html = " ".join(["info@TEST.com"] + addresses[:2] + addresses)
+        info = firecrawl_service.extract_company_info({"html": html})
+        assert info["emails"] == addresses[:5]
+    
+    def test_detects_technologies_case_insensitively(self, firecrawl_service):
+        """Signatures should match regardless of case in the HTML or the signature."""
+        html = (
+            '<html><head><script src="/WP-Content/app.js"></script>'
+            '<script src="https://connect.facebook.net/en_US/fbevents.js"></script>'
+            '</head><body></body></html>'
+        )
+        info = firecrawl_service.extract_company_info({"html": html})
+        assert info["technologies"] == ["WordPress", "Facebook Pixel"]
+    
+    def test_long_token_runs_scanned_in_linear_time(self, firecrawl_service):
+        """Long runs without an "@" should not be rescanned from every offset."""
+        def best_time(run_length):
+            html = "<p>" + "a" * run_length + " " + "1" * run_length + " info@acme.co.za</p>"
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                info = firecrawl_service.extract_company_info({"html": html})
+                timings.append(time.perf_counter() - start)
+            assert info["emails"] == ["info@acme.co.za"]
+            assert info["phones"] == []
+            return min(timings)
+        
+        # 10x the input: about 10x the time if linear, 100x if quadratic
+        assert best_time(200000) < 20 * best_time(20000)
+
+
+class TestFirecrawlUsage:
+    """Test Firecrawl credit tracking."""
+    
+    @pytest.fixture
+    def service(self, firecrawl_service, db_session):
+        """FirecrawlService starting from a clean month in the test database."""
+        service = firecrawl_service
+        month = service._get_current_month()
+        db_session.query(FirecrawlUsage).filter(FirecrawlUsage.month == month).delete()
+        db_session.commit()
+        yield service
+        db_session.query(FirecrawlUsage).filter(FirecrawlUsage.month == month).delete()
+        db_session.commit()
+    
+    def _stored_credits(self, service):
+        return service.db.query(FirecrawlUsage.credit_count).filter(
+            FirecrawlUsage.month == service._get_current_month()
+        ).scalar()
+    
+    def test_increment_writes_immediately_by_default(self, service):
+        """Credits should be stored as soon as they are recorded."""
+        service._increment_usage(2)
+        assert self._stored_credits(service) == 2
+        assert service._check_usage_limit()[0] == 2
+    
+    def test_unflushed_credits_count_towards_limit(self, service):
+        """Deferred credits should be written once, on flush."""
+        service._increment_usage(1, flush=False)
+        service._increment_usage(1, flush=False)
+        assert self._stored_credits(service) is None
+        assert service._check_usage_limit()[0] == 2
+        
+        service.flush_usage()
+        assert self._stored_credits(service) == 2
+    
+    def test_cached_scrape_spends_no_credit(self, service):
+        """A repeat scrape of the same URL should be served from the cache."""
+        class StubClient:
+            calls = 0
+            
+            def scrape(self, url, **kwargs):
+                StubClient.calls += 1
+                return {"html": "<p>Hi</p>", "markdown": "Hi", "metadata": {"title": "Acme"}}
+        
+        url = "https://cache-test.example.com"
+        service.__dict__["client"] = StubClient()
+        try:
+            first = service.scrape_website(url)
+            second = service.scrape_website(url)
+            assert StubClient.calls == 1
+            assert second["title"] == "Acme"
+            assert second["tree"] is not None  # Re-parsed, not stored
+            assert second["scraped_at"] == first["scraped_at"]
+            assert self._stored_credits(service) == 1
+        finally:
+            service.db.query(ScrapeCache).filter(ScrapeCache.key == _cache_key(url)).delete()
+            service.db.commit()
+    
+    @pytest.fixture
+    def requested(self, service, monkeypatch):
+        """URLs sent to a mocked Firecrawl endpoint; URLs containing "bad" fail."""
+        urls = []
+        
+        def handler(request):
+            url = json.loads(request.content)["url"]
+            urls.append(url)
+            if "bad" in url:
+                return httpx.Response(500, json={"success": False, "error": "boom"})
+            return httpx.Response(200, json={"success": True, "data": {
+                "markdown": "Hi", "html": "<p>Hi</p>", "metadata": {"title": url},
+            }})
+        
+        async_client = httpx.AsyncClient
+        monkeypatch.setattr(
+            firecrawl_api.httpx, "AsyncClient",
+            lambda **kwargs: async_client(transport=httpx.MockTransport(handler), **kwargs)
+        )
+        yield urls
+        service.db.query(ScrapeCache).filter(ScrapeCache.url.like("https://many-%")).delete()
+        service.db.commit()
+    
+    def test_scrape_many_returns_errors_in_place(self, service, requested):
+        """Failures come back as FirecrawlError at their position; duplicates are charged once."""
+        usage_writes = []
+        
+        def count_usage_writes(conn, cursor, statement, *args):
+            if statement.startswith("INSERT INTO firecrawl_usage"):
+                usage_writes.append(statement)
+        
+        urls = ["https://many-a.test", "https://many-bad.test", "https://many-a.test", "https://many-b.test"]
+        engine = service.db.get_bind()
+        event.listen(engine, "before_cursor_execute", count_usage_writes)
+        try:
+            results = asyncio.run(service.scrape_many(urls))
+        finally:
+            event.remove(engine, "before_cursor_execute", count_usage_writes)
+        
+        assert sorted(requested) == sorted(set(urls))
+        assert results[0]["title"] == "https://many-a.test"
+        assert isinstance(results[1], FirecrawlError)
+        assert results[2]["title"] == "https://many-a.test"
+        assert results[3]["tree"] is not None
+        assert self._stored_credits(service) == 2
+        assert len(usage_writes) == 1
+    
+    def test_scrape_many_cache_hit_spends_no_credit(self, service, requested):
+        """A URL scraped by an earlier batch should be served from the cache."""
+        asyncio.run(service.scrape_many(["https://many-cached.test"]))
+        requested.clear()
+        results = asyncio.run(service.scrape_many(["https://many-cached.test"]))
+        
+        assert requested == []
+        assert results[0]["title"] == "https://many-cached.test"
+        assert self._stored_credits(service) == 1
+    
+    def test_scrape_many_rejects_batch_over_limit(self, service, requested, monkeypatch):
+        """A batch needing more credits than remain should not be started."""
+        monkeypatch.setattr(
+            firecrawl_api, "settings",
+            dataclasses.replace(firecrawl_api.settings, FIRECRAWL_MONTHLY_LIMIT=2)
+        )
+        with pytest.raises(FirecrawlLimitExceeded):
+            asyncio.run(service.scrape_many(["https://many-1.test", "https://many-2.test", "https://many-3.test"]))
+        assert requested == []
+        assert self._stored_credits(service) is None
@@ -111,12 +111,23 @@ class TestLeadScoring:
             rating=4.5,
             review_count=100,
             phone="+123",
-            business_types="[]"
+            business_types=[]
         )
         result = business.to_dict()
         assert "lead_score" in result
         assert result["lead_score"] == 100  # 50 + 20 + 15 + 15
 
+    
+    def test_to_dict_uses_stored_lead_score(self):
+        """to_dict() should return the stored lead_score when set."""
+        business = Business(
+            name="Test Business",
+            website=None,
+            phone="+123",
+            lead_score=42
+        )
+        assert business.to_dict()["lead_score"] == 42
+
 
 class TestBusinessModel:
     """Test Business model general functionality."""
@@ -132,7 +143,7 @@ class TestBusinessModel:
             website="https://test.com",
             rating=4.5,
             review_count=100,
-            business_types='["restaurant", "food"]',
+            business_types=["restaurant", "food"],
             latitude=12.34,
             longitude=56.78
         )
@@ -147,10 +158,10 @@ class TestBusinessModel:
             assert key in result, f"Missing key: {key}"
     
     def test_business_types_parsed_as_list(self):
-        """business_types JSON should be parsed to list."""
+        """business_types JSON column should be returned as list."""
         business = Business(
             name="Test",
-            business_types='["restaurant", "cafe"]'
+            business_types=["restaurant", "cafe"]
         )
         result = business.to_dict()
         assert result["business_types"] == ["restaurant", "cafe"]
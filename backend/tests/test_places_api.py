@@ -0,0 +1,66 @@
+"""Unit tests for the Google Places service."""
+import dataclasses
+import threading
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import services.places_api as places_api
+from app.database import init_db, SessionLocal, APIUsage
+from services.places_api import PlacesService
+
+
+@pytest.fixture
+def month(monkeypatch):
+    """Current month, with a dummy API key and no stored usage for it."""
+    monkeypatch.setattr(
+        places_api, "settings",
+        dataclasses.replace(places_api.settings, GOOGLE_MAPS_API_KEY="AIza-test-key")
+    )
+    init_db()
+    db = SessionLocal()
+    month = PlacesService(db)._get_current_month()
+    db.query(APIUsage).filter(APIUsage.month == month).delete()
+    db.commit()
+    yield month
+    db.query(APIUsage).filter(APIUsage.month == month).delete()
+    db.commit()
+    db.close()
+
+
+class TestAPIUsage:
+    """Test Places API call tracking."""
+    
+    def test_concurrent_first_increments_all_counted(self, month):
+        """Searches racing to create the month's row should neither fail nor lose calls."""
+        barrier = threading.Barrier(8)
+        errors = []
+        
+        def increment():
+            db = SessionLocal()
+            try:
+                service = PlacesService(db)
+                barrier.wait()
+                service._increment_api_usage(1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.close()
+        
+        threads = [threading.Thread(target=increment) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        db = SessionLocal()
+        try:
+            assert errors == []
+            assert db.query(APIUsage.call_count).filter(APIUsage.month == month).scalar() == 8
+            assert PlacesService(db).get_usage_stats()["calls_used"] == 8
+        finally:
+            db.close()
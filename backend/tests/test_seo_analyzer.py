@@ -0,0 +1,160 @@
+"""Unit tests for the SEO analyzer."""
+import pytest
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from lxml import etree
+
+from services.html_parser import parse_html
+from services.seo_analyzer import SEOAnalyzer
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width">
+<title>Acme Plumbing - Emergency Repairs in Springfield</title>
+</head>
+<body>
+<header>Site header text</header>
+<nav><a href="/">Home</a></nav>
+<h1>Acme Plumbing</h1>
+<p>We fix leaks fast.</p>
+<script>var ignored = "words in scripts";</script>
+<footer>Footer text</footer>
+</body>
+</html>"""
+
+
+class TestSEOAnalyzer:
+    """Test single-page analysis."""
+    
+    def test_missing_html_returns_error(self):
+        """Empty HTML cannot be analyzed."""
+        result = SEOAnalyzer("", "https://example.com").analyze()
+        assert result["success"] is False
+        assert result["overall_score"] == 0
+    
+    def test_extracts_title_and_headings(self):
+        """Title and H1 text should be reported in metrics."""
+        result = SEOAnalyzer(PAGE, "https://example.com").analyze()
+        assert result["success"] is True
+        assert result["metrics"]["title"] == "Acme Plumbing - Emergency Repairs in Springfield"
+        assert result["metrics"]["h1_count"] == 1
+        assert result["metrics"]["h1_text"] == ["Acme Plumbing"]
+    
+    def test_word_count_skips_non_content_elements(self):
+        """Header, nav, footer and script text should not count as content."""
+        result = SEOAnalyzer(PAGE, "https://example.com").analyze()
+        # 7 title words + 2 heading words + 4 paragraph words
+        assert result["metrics"]["word_count"] == 13
+    
+    def test_shared_tree_gives_same_result(self):
+        """Passing an already-parsed tree should not change the report."""
+        own = SEOAnalyzer(PAGE, "https://example.com").analyze()
+        shared = SEOAnalyzer(PAGE, "https://example.com", tree=parse_html(PAGE)).analyze()
+        own.pop("analyzed_at")
+        shared.pop("analyzed_at")
+        assert own == shared
+    
+    def test_analysis_leaves_tree_untouched(self):
+        """The shared tree must not be mutated, so analysis can be repeated."""
+        tree = parse_html(PAGE)
+        before = etree.tostring(tree)
+        first = SEOAnalyzer(PAGE, "https://example.com", tree=tree).analyze()
+        second = SEOAnalyzer(PAGE, "https://example.com", tree=tree).analyze()
+        assert etree.tostring(tree) == before
+        assert first["metrics"]["word_count"] == second["metrics"]["word_count"] == 13
+    
+    def test_meta_tags_matched_case_insensitively_first_wins(self):
+        """Meta names are case-insensitive; the first tag for a name is used."""
+        html = (
+            '<html><head>'
+            '<meta name="Description" content="First description">'
+            '<meta name="description" content="Second description">'
+            '<meta property="OG:Title" content="Acme">'
+            '</head><body></body></html>'
+        )
+        result = SEOAnalyzer(html, "https://example.com").analyze()
+        assert result["metrics"]["meta_description"] == "First description"
+        assert result["metrics"]["has_og_tags"] is True
+        assert result["metrics"]["has_viewport"] is False
+        assert result["metrics"]["has_charset"] is False
+    
+    def test_page_size_counts_bytes_and_accepts_bytes(self):
+        """Page size is the UTF-8 byte length; raw bytes give the same report."""
+        html = "<html><body><p>" + "é" * 1024 + "</p></body></html>"
+        from_str = SEOAnalyzer(html, "https://example.com").analyze()
+        from_bytes = SEOAnalyzer(html.encode("utf-8"), "https://example.com").analyze()
+        assert from_str["metrics"]["page_size_kb"] == round(len(html.encode("utf-8")) / 1024, 2)
+        from_str.pop("analyzed_at")
+        from_bytes.pop("analyzed_at")
+        assert from_str == from_bytes
+    
+    def test_structured_data_types_reported(self):
+        """Schema.org types are collected from valid LD-JSON; invalid blocks are flagged."""
+        html = (
+            '<html><head>'
+            '<script type="application/ld+json">{"@type": "Plumber", "name": "Acme"}</script>'
+            '<script type="application/ld+json">{"@graph": [{"@type": ["Organization", "Plumber"]}]}</script>'
+            '<script type="application/ld+json">{not json</script>'
+            '</head><body></body></html>'
+        )
+        result = SEOAnalyzer(html, "https://example.com").analyze()
+        assert result["metrics"]["has_structured_data"] is True
+        assert result["metrics"]["structured_data_types"] == ["Plumber", "Organization"]
+        messages = [i["message"] for i in result["issues"] if i["category"] == "technical"]
+        assert "1 structured data blocks contain invalid JSON" in messages
+    
+    def test_link_classification(self):
+        """Links should be split into internal, external, broken and empty."""
+        html = (
+            '<html><body>'
+            '<a href="/about">About</a><a href="#team">Team</a>'
+            '<a href="https://example.com/contact">Contact</a><a href="services">Services</a>'
+            '<a href="https://other.org">Partner</a>'
+            '<a href="">x</a><a href="#">y</a><a href="javascript:void(0)">z</a>'
+            '<a href="/logo"><img src="logo.png" alt="Logo"></a>'
+            '<a href="/blank">&nbsp;</a>'
+            '</body></html>'
+        )
+        result = SEOAnalyzer(html, "https://example.com").analyze()
+        assert result["metrics"]["internal_links"] == 6
+        assert result["metrics"]["external_links"] == 1
+        assert result["metrics"]["broken_links"] == 3
+        messages = [i["message"] for i in result["issues"] if i["category"] == "links"]
+        assert "1 links without anchor text" in messages
+
+
+class TestAnalyzeBatch:
+    """Test multi-page analysis."""
+    
+    def test_returns_one_report_per_page_in_order(self):
+        """Reports should line up with the input pages."""
+        pages = [
+            {"html": PAGE, "url": "https://example.com/"},
+            {"html": "", "url": "https://example.com/empty"},
+            {"html": PAGE, "url": "http://example.com/", "tree": parse_html(PAGE)},
+        ]
+        results = SEOAnalyzer.analyze_batch(pages)
+        assert [r.get("url") for r in results] == ["https://example.com/", None, "http://example.com/"]
+        assert results[1]["success"] is False
+        assert results[2]["metrics"]["is_https"] is False
+    
+    def test_analyze_many_matches_sequential_batch(self):
+        """Parallel analysis should return the same reports in the same order."""
+        pages = [
+            {"html": PAGE, "url": "https://example.com/"},
+            {"html": "", "url": "https://example.com/empty"},
+            {"html": PAGE.replace("Acme", "Zenith"), "url": "http://example.com/"},
+        ]
+        parallel = SEOAnalyzer.analyze_many(pages, workers=2)
+        sequential = SEOAnalyzer.analyze_batch(pages)
+        for report in parallel + sequential:
+            report.pop("analyzed_at", None)
+        assert parallel == sequential